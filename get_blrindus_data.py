@@ -1,21 +1,29 @@
-import requests
-import json
-import pandas as pd
+import asyncio
+import csv
 import logging
+import logging.handlers
 import os
 import ast
 import argparse
-from urllib.parse import urlencode
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import atexit
+import pathlib
+import random
+import time
+from urllib.parse import urlencode, urlparse
 from collections import defaultdict
-from ratelimit import limits, sleep_and_retry
-from functools import lru_cache
-from xml.etree import ElementTree as ET
+from lxml import etree
+import aiohttp
 import backoff
+import orjson
 from tqdm import tqdm
 
-# Set up logging (INFO for debugging)
-logging.basicConfig(level=logging.INFO, filename="kiadb_scrape.log", format="%(asctime)s - %(levelname)s - %(message)s")
+# Set up logging (INFO for debugging). File writes go through a
+# MemoryHandler so the hot path never waits on a disk write per line;
+# logging.shutdown() flushes the buffer at exit.
+_file_handler = logging.FileHandler("kiadb_scrape.log")
+_file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.MemoryHandler(capacity=1000, target=_file_handler)])
+logger = logging.getLogger(__name__)
 
 # Field mapping for CSV
 field_mapping = {
@@ -57,6 +65,24 @@ field_mapping = {
     "ETP": {"primary": "etp", "arcgis": None, "iis": None}
 }
 
+# Inverted lookup tables built once at import, so the per-plot mapping
+# loops iterate the response keys instead of the whole field_mapping.
+# Values are lists because some API fields (e.g. pltar) feed several CSV
+# columns.
+PRIMARY_SINGLE = {}
+IIS_SINGLE = {}
+PRIMARY_MULTI = []
+IIS_MULTI = []
+for _csv_field, _info in field_mapping.items():
+    if isinstance(_info["primary"], str):
+        PRIMARY_SINGLE.setdefault(_info["primary"], []).append(_csv_field)
+    elif isinstance(_info["primary"], list):
+        PRIMARY_MULTI.append((_csv_field, _info["primary"]))
+    if isinstance(_info["iis"], str):
+        IIS_SINGLE.setdefault(_info["iis"], []).append(_csv_field)
+    elif isinstance(_info["iis"], list):
+        IIS_MULTI.append((_csv_field, _info["iis"]))
+
 # Headers
 headers = {
     "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:138.0) Gecko/20100101 Firefox/138.0",
@@ -79,42 +105,137 @@ soap_template = """<?xml version="1.0" encoding="utf-8"?>
     </soap:Body>
 </soap:Envelope>"""
 
-# Rate limiting: 3 calls per second
-CALLS = 3
-PERIOD = 1
-
-# Cache for invalid pltcode responses
-invalid_pltcode_cache = set()
-
-@sleep_and_retry
-@limits(calls=CALLS, period=PERIOD)
-def make_request(session, url, method="POST", json=None, data=None, headers=None):
-    try:
-        response = session.request(method, url, json=json, data=data, headers=headers, timeout=5)
-        response.raise_for_status()
-        logging.info(f"Request succeeded for {url}")
-        return response
-    except requests.RequestException as e:
-        logging.error(f"Request failed for {url}: {str(e)}")
-        return None
+# Bound in-flight requests (replaces the old thread pool cap)
+REQUEST_CONCURRENCY = 16
+request_semaphore = asyncio.Semaphore(REQUEST_CONCURRENCY)
+
+class TokenBucket:
+    """Per-host rate limiter: tokens replenish at `rate` per second up to
+    `capacity`. A 429 halves the rate (multiplicative decrease); a run of
+    successes restores it toward the configured rate."""
+
+    def __init__(self, rate, capacity):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._successes = 0
+
+    async def acquire(self):
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def throttle(self):
+        self.rate = max(self.base_rate / 8, self.rate / 2)
+        self._successes = 0
+        logger.warning("Rate limited: bucket rate lowered to %.2f req/s", self.rate)
+
+    def reward(self):
+        self._successes += 1
+        if self._successes >= 20 and self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate * 2)
+            self._successes = 0
+
+# Independent budgets per upstream host
+KIADB_BUCKET = TokenBucket(3, 3)
+KGIS_BUCKET = TokenBucket(5, 5)
+_BUCKETS = {
+    "kiadb.karnataka.gov.in": KIADB_BUCKET,
+    "kgis.ksrsac.in": KGIS_BUCKET,
+}
 
-@backoff.on_exception(backoff.expo, requests.RequestException, max_tries=3)
-def soap_fallback(session, url, method, plcd):
+# Cache for invalid pltcode responses, persisted across runs so reruns
+# never re-issue rate-limited requests for known-bad plotcodes
+INVALID_PATH = pathlib.Path(".invalid_pltcodes.txt")
+invalid_pltcode_cache = set(INVALID_PATH.read_text().split()) if INVALID_PATH.exists() else set()
+atexit.register(lambda: INVALID_PATH.write_text("\n".join(sorted(invalid_pltcode_cache))))
+
+# Transient statuses worth retrying; 429 additionally throttles the bucket
+RETRY_STATUSES = (429, 503)
+MAX_TRIES = 5
+
+def _retry_delay(error, attempt):
+    # Honor Retry-After when the server sends one, otherwise exponential
+    # backoff with full jitter so retries don't stampede in sync
+    if error.headers and error.headers.get("Retry-After", "").isdigit():
+        return int(error.headers["Retry-After"])
+    return random.uniform(0, 2 ** attempt)
+
+async def _fetch(session, url, method, read, json=None, data=None, headers=None):
+    bucket = _BUCKETS.get(urlparse(url).netloc)
+    async with request_semaphore:
+        for attempt in range(MAX_TRIES):
+            if bucket:
+                await bucket.acquire()
+            try:
+                async with session.request(method, url, json=json, data=data, headers=headers) as response:
+                    response.raise_for_status()
+                    logger.debug("Request succeeded for %s", url)
+                    if bucket:
+                        bucket.reward()
+                    return await read(response)
+            except aiohttp.ClientResponseError as e:
+                if e.status in RETRY_STATUSES and attempt < MAX_TRIES - 1:
+                    if e.status == 429 and bucket:
+                        bucket.throttle()
+                    delay = _retry_delay(e, attempt)
+                    logger.warning("HTTP %s for %s, retrying in %.1fs", e.status, url, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error("Request failed for %s: %s", url, e)
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error("Request failed for %s: %s", url, e)
+                return None
+
+async def _read_json(response):
+    return orjson.loads(await response.read())
+
+async def _read_bytes(response):
+    return await response.read()
+
+async def fetch_json(session, url, method="POST", json=None, data=None, headers=None):
+    return await _fetch(session, url, method, _read_json, json=json, data=data, headers=headers)
+
+async def fetch_raw(session, url, method="POST", data=None, headers=None):
+    return await _fetch(session, url, method, _read_bytes, data=data, headers=headers)
+
+@backoff.on_exception(backoff.expo, (aiohttp.ClientError, asyncio.TimeoutError), max_tries=3)
+async def soap_fallback(session, url, method, plcd):
     soap_data = soap_template.format(method=method, plcd=plcd)
     soap_headers = headers.copy()
     soap_headers["Content-Type"] = "text/xml; charset=utf-8"
     soap_headers["SOAPAction"] = f"http://kiadb.karnataka.gov.in/kiadbgisportal/sulb/{method}"
-    response = make_request(session, url, data=soap_data, headers=soap_headers)
-    if response:
-        root = ET.fromstring(response.text)
-        result = root.find(f".//{method}Result").text
-        logging.info(f"SOAP fallback succeeded for {method} with plcd {plcd}")
-        return json.loads(result) if result else []
-    logging.error(f"SOAP fallback failed for {method} with plcd {plcd}")
+    raw = await fetch_raw(session, url, data=soap_data, headers=soap_headers)
+    if raw:
+        root = etree.fromstring(raw)
+        result = root.xpath(f"//*[local-name()='{method}Result']/text()")
+        logger.debug("SOAP fallback succeeded for %s with plcd %s", method, plcd)
+        return orjson.loads(result[0]) if result else []
+    logger.error("SOAP fallback failed for %s with plcd %s", method, plcd)
     return []
 
-@lru_cache(maxsize=100)
-def query_arcgis(session, geometry_json):
+# Explicit envelope cache keyed on rounded bounds, so identical bounding
+# boxes are never re-queried regardless of session or float noise
+_ARCGIS_CACHE: dict[tuple, dict] = {}
+
+async def query_arcgis(session, batch):
+    key = (int(batch["xmin"]), int(batch["ymin"]), int(batch["xmax"]), int(batch["ymax"]))
+    hit = _ARCGIS_CACHE.get(key)
+    if hit is not None:
+        logger.debug("ArcGIS cache hit for envelope %s", key)
+        return hit
+    geometry_json = orjson.dumps({**batch, "spatialReference": {"wkid": 102100}}).decode()
     arcgis_base = "https://kgis.ksrsac.in/kgismaps2/rest/services/KIADB/KIADB/MapServer/1/query"
     query_params = {
         "f": "json",
@@ -127,309 +248,361 @@ def query_arcgis(session, geometry_json):
         "outSR": 102100,
     }
     arcgis_url = f"{arcgis_base}?{urlencode(query_params)}"
-    response = make_request(session, arcgis_url, method="GET")
-    return response.json() if response else {}
+    result = await fetch_json(session, arcgis_url, method="GET")
+    result = result if result else {}
+    _ARCGIS_CACHE[key] = result
+    return result
 
-def process_plotcode(session, plotcode, district_space, industrial_area_space, coord_file):
+async def process_plotcode(session, plotcode, district_space, industrial_area_space, coord_file):
     if plotcode in invalid_pltcode_cache:
-        logging.info(f"Skipping cached invalid plotcode {plotcode}")
+        logger.debug("Skipping cached invalid plotcode %s", plotcode)
         return None
 
     # Initialize row with all field_mapping keys
     row = {"Plotcode": plotcode}
     for csv_field in field_mapping:
         row[csv_field] = "N/A"
-    
-    # getdeatilsforidentifier
+
+    # Fire both endpoints concurrently to overlap the two per-plot round trips
     details_url = "http://kiadb.karnataka.gov.in/kiadbgisportal/sulb.asmx/getdeatilsforidentifier"
-    response = make_request(session, details_url, json={"plcd": plotcode})
-    if not response:
-        details = soap_fallback(session, details_url, "getdeatilsforidentifier", plotcode)
+    iis_url = "http://kiadb.karnataka.gov.in/kiadbgisportal/sulb.asmx/getplotiisdetails"
+    details_raw, iis_raw = await asyncio.gather(
+        fetch_json(session, details_url, json={"plcd": plotcode}),
+        fetch_json(session, iis_url, json={"plcd": plotcode}),
+    )
+
+    # getdeatilsforidentifier
+    if details_raw is None:
+        details = await soap_fallback(session, details_url, "getdeatilsforidentifier", plotcode)
         details = details[0] if details else {}
     else:
-        details = response.json()
-        if details.get("d") == "\"Wrong Input\"" or not details.get("d"):
+        # Pull the double-encoded payload out once and short-circuit on
+        # the sentinel before spending a second decode on it
+        d = details_raw.get("d")
+        if not d or d == "\"Wrong Input\"":
             invalid_pltcode_cache.add(plotcode)
-            logging.info(f"Invalid response for plotcode {plotcode}: {details.get('d')}")
+            logger.debug("Invalid response for plotcode %s: %s", plotcode, d)
             return None
         try:
-            details = json.loads(details.get("d", "[]"))
-            details = details[0] if isinstance(details, list) and details else {}
-        except json.JSONDecodeError:
-            logging.error(f"JSON decode error for plotcode {plotcode}: {details.get('d')}")
+            parsed = orjson.loads(d)
+        except orjson.JSONDecodeError:
+            logger.error("JSON decode error for plotcode %s: %s", plotcode, d)
             return None
+        details = parsed[0] if isinstance(parsed, list) and parsed else {}
 
     if details.get("plst") != "Allotted":
-        logging.info(f"Skipping non-allotted plotcode {plotcode} with plst: {details.get('plst')}")
+        logger.debug("Skipping non-allotted plotcode %s with plst: %s", plotcode, details.get("plst"))
         return None
 
     # Map fields from getdeatilsforidentifier
-    for csv_field, field_info in field_mapping.items():
-        primary_field = field_info["primary"]
-        if primary_field:
-            if isinstance(primary_field, list):
-                for field in primary_field:
-                    if field in details:
-                        row[csv_field] = details[field]
-                        logging.info(f"Mapped {csv_field} from getdeatilsforidentifier: {row[csv_field]} for {plotcode}")
-                        break
-            else:
-                if primary_field in details:
-                    row[csv_field] = details.get(primary_field)
-                    logging.info(f"Mapped {csv_field} from getdeatilsforidentifier: {row[csv_field]} for {plotcode}")
+    for api_field, value in details.items():
+        for csv_field in PRIMARY_SINGLE.get(api_field, ()):
+            row[csv_field] = value
+            logger.debug("Mapped %s from getdeatilsforidentifier: %s for %s", csv_field, row[csv_field], plotcode)
+    for csv_field, candidates in PRIMARY_MULTI:
+        for field in candidates:
+            if field in details:
+                row[csv_field] = details[field]
+                logger.debug("Mapped %s from getdeatilsforidentifier: %s for %s", csv_field, row[csv_field], plotcode)
+                break
 
     # getplotiisdetails
-    iis_url = "http://kiadb.karnataka.gov.in/kiadbgisportal/sulb.asmx/getplotiisdetails"
-    response = make_request(session, iis_url, json={"plcd": plotcode})
-    if not response:
-        iis_details = soap_fallback(session, iis_url, "getplotiisdetails", plotcode)
+    if iis_raw is None:
+        iis_details = await soap_fallback(session, iis_url, "getplotiisdetails", plotcode)
     else:
-        iis_details = response.json()
-        iis_details = json.loads(iis_details.get("d", "[]")) if iis_details.get("d") else []
+        d = iis_raw.get("d")
+        iis_details = orjson.loads(d) if d and d != "\"Wrong Input\"" else []
 
     if iis_details and isinstance(iis_details, list) and iis_details:
         iis_details = iis_details[0]
-        for csv_field, field_info in field_mapping.items():
-            iis_field = field_info["iis"]
-            if iis_field and (row[csv_field] == "N/A"):
-                if isinstance(iis_field, list):
-                    for field in iis_field:
-                        if field in iis_details:
-                            row[csv_field] = iis_details[field]
-                            logging.info(f"Mapped {csv_field} from getplotiisdetails: {row[csv_field]} for {plotcode}")
-                            break
-                else:
-                    if iis_field in iis_details:
-                        row[csv_field] = iis_details.get(iis_field)
-                        logging.info(f"Mapped {csv_field} from getplotiisdetails: {row[csv_field]} for {plotcode}")
+        for api_field, value in iis_details.items():
+            for csv_field in IIS_SINGLE.get(api_field, ()):
+                if row[csv_field] == "N/A":
+                    row[csv_field] = value
+                    logger.debug("Mapped %s from getplotiisdetails: %s for %s", csv_field, row[csv_field], plotcode)
+        for csv_field, candidates in IIS_MULTI:
+            if row[csv_field] == "N/A":
+                for field in candidates:
+                    if field in iis_details:
+                        row[csv_field] = iis_details[field]
+                        logger.debug("Mapped %s from getplotiisdetails: %s for %s", csv_field, row[csv_field], plotcode)
+                        break
 
     return row
 
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description="Debuggable optimized KIADB plot data scraper")
-parser.add_argument("--coord_file", help="Path to a single coordinate file")
-args = parser.parse_args()
-
-# Determine coordinate files
-input_dir = "coordinates"
-if args.coord_file:
-    coord_file = args.coord_file
-    if not os.path.exists(coord_file):
-        print(f"Error: Coordinate file {coord_file} does not exist")
-        logging.error(f"Coordinate file {coord_file} does not exist")
-        exit()
-    coordinate_files = [coord_file]
-else:
-    if not os.path.exists(input_dir):
-        print(f"Error: Coordinates directory {input_dir} does not exist")
-        logging.error(f"Coordinates directory {input_dir} does not exist")
-        exit()
-    coordinate_files = [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(".txt")]
-    if not coordinate_files:
-        print(f"No coordinate files found in {input_dir}/")
-        logging.error(f"No coordinate files found in {input_dir}/")
-        exit()
-
-# Create output directory
-output_dir = "kiadb_data"
-os.makedirs(output_dir, exist_ok=True)
-
-# ArcGIS API base URL
-arcgis_base = "https://kgis.ksrsac.in/kgismaps2/rest/services/KIADB/KIADB/MapServer/1/query"
-
-# Initialize session
-session = requests.Session()
-session.headers.update(headers)
-session.get("http://kiadb.karnataka.gov.in/kiadbgisportal/")
-
-# Initialize summary data
-summary_data = []
-
-# Process each coordinate file
-for coord_file in coordinate_files:
-    filename = os.path.splitext(os.path.basename(coord_file))[0]
-    try:
-        district, industrial_area = filename.split("-", 1)
-        district_space = district.replace("_", " ")
-        industrial_area_space = industrial_area.replace("_", " ")
-        district_underscore = district
-        industrial_area_underscore = industrial_area
-    except ValueError:
-        print(f"Error: Filename {filename} must be in format <district>-<industrial_area>.txt")
-        logging.error(f"Filename {filename} must be in format <district>-<industrial_area>.txt")
-        continue
-
-    logging.info(f"Processing coordinate file: {coord_file}")
-    print(f"Processing {coord_file}...")
-
-    # Read coordinates
-    try:
-        with open(coord_file, "r") as f:
-            lat_lon = ast.literal_eval(f.read().split("=", 1)[1].strip())
-    except Exception as e:
-        print(f"Error reading {coord_file}: {str(e)}")
-        logging.error(f"Error reading {coord_file}: {str(e)}")
-        continue
-
-    coordinates = [{"x": x, "y": y} for x, y in lat_lon]
-    logging.info(f"Loaded {len(coordinates)} coordinates from {coord_file}")
-
-    # Batch coordinates for ArcGIS queries
-    extracted_data = []
-    processed_plotcodes = set()
-    pltcode_bases = set()
-    known_suffixes = defaultdict(set)
-
-    def batch_coordinates(coords, batch_size=5):
-        for i in range(0, len(coords), batch_size):
-            batch = coords[i:i + batch_size]
-            min_x = min(c["x"] for c in batch) - 100
-            max_x = max(c["x"] for c in batch) + 100
-            min_y = min(c["y"] for c in batch) - 100
-            max_y = max(c["y"] for c in batch) + 100
-            yield {"xmin": min_x, "ymin": min_y, "xmax": max_x, "ymax": max_y}
-
-    # Process ArcGIS queries
-    for batch in tqdm(batch_coordinates(coordinates), total=(len(coordinates) + 4) // 5, desc="ArcGIS Queries"):
-        arcgis_data = query_arcgis(session, json.dumps({**batch, "spatialReference": {"wkid": 102100}}))
-        features = arcgis_data.get("features", [])
-        if not features:
-            logging.warning(f"No features found for batch {batch} in {coord_file}")
-            continue
-
-        plotcodes = []
-        for feature in features:
-            plotcode = feature.get("attributes", {}).get("plotcode")
-            if not plotcode or plotcode in processed_plotcodes:
+async def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Debuggable optimized KIADB plot data scraper")
+    parser.add_argument("--coord_file", help="Path to a single coordinate file")
+    args = parser.parse_args()
+
+    # Determine coordinate files
+    input_dir = "coordinates"
+    if args.coord_file:
+        coord_file = args.coord_file
+        if not os.path.exists(coord_file):
+            print(f"Error: Coordinate file {coord_file} does not exist")
+            logging.error(f"Coordinate file {coord_file} does not exist")
+            exit()
+        coordinate_files = [coord_file]
+    else:
+        if not os.path.exists(input_dir):
+            print(f"Error: Coordinates directory {input_dir} does not exist")
+            logging.error(f"Coordinates directory {input_dir} does not exist")
+            exit()
+        coordinate_files = [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith((".json", ".txt"))]
+        if not coordinate_files:
+            print(f"No coordinate files found in {input_dir}/")
+            logging.error(f"No coordinate files found in {input_dir}/")
+            exit()
+
+    # Create output directory
+    output_dir = "kiadb_data"
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Persist cookies across runs so short reruns skip the cold
+    # session-bootstrap handshake against the portal
+    cookie_jar = aiohttp.CookieJar()
+    jar_path = pathlib.Path(".kiadb_cookies.pkl")
+    warm = False
+    if jar_path.exists():
+        try:
+            cookie_jar.load(jar_path)
+            warm = len(cookie_jar) > 0
+            logging.info(f"Loaded {len(cookie_jar)} cookies from {jar_path}")
+        except Exception as e:
+            logging.warning(f"Could not load cookie jar {jar_path}: {e}")
+
+    # Single session with a tuned keep-alive pool shared by every coroutine
+    connector = aiohttp.TCPConnector(limit=32, limit_per_host=16, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers, cookie_jar=cookie_jar) as session:
+        if not warm:
+            await fetch_raw(session, "http://kiadb.karnataka.gov.in/kiadbgisportal/", method="GET")
+            cookie_jar.save(jar_path)
+
+        # Initialize summary data
+        summary_data = []
+
+        # Process each coordinate file
+        for coord_file in coordinate_files:
+            filename = os.path.splitext(os.path.basename(coord_file))[0]
+            try:
+                district, industrial_area = filename.split("-", 1)
+                district_space = district.replace("_", " ")
+                industrial_area_space = industrial_area.replace("_", " ")
+                district_underscore = district
+                industrial_area_underscore = industrial_area
+            except ValueError:
+                print(f"Error: Filename {filename} must be in format <district>-<industrial_area>.txt")
+                logging.error(f"Filename {filename} must be in format <district>-<industrial_area>.txt")
+                continue
+
+            logging.info(f"Processing coordinate file: {coord_file}")
+            print(f"Processing {coord_file}...")
+
+            # Read coordinates
+            try:
+                if coord_file.endswith(".json"):
+                    with open(coord_file, "rb") as f:
+                        lat_lon = orjson.loads(f.read())["lat_lon"]
+                else:
+                    # Legacy Python-literal coordinate files
+                    with open(coord_file, "r") as f:
+                        lat_lon = ast.literal_eval(f.read().split("=", 1)[1].strip())
+            except Exception as e:
+                print(f"Error reading {coord_file}: {str(e)}")
+                logging.error(f"Error reading {coord_file}: {str(e)}")
                 continue
-            processed_plotcodes.add(plotcode)
-            plotcodes.append(plotcode)
-
-            if len(plotcode) == 14 and plotcode[12:].isdigit():
-                pltcode_base = plotcode[:12]
-                suffix = int(plotcode[12:])
-                pltcode_bases.add(pltcode_base)
-                known_suffixes[pltcode_base].add(suffix)
-                logging.info(f"Added pltcode_base: {pltcode_base} with suffix {suffix:02d} from {plotcode}")
-            else:
-                logging.warning(f"Invalid plotcode format: {plotcode} (length: {len(plotcode)})")
-
-        # Process plotcodes in parallel
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_plotcode = {
-                executor.submit(process_plotcode, session, pc, district_space, industrial_area_space, coord_file): pc
-                for pc in plotcodes
-            }
-            for future in tqdm(as_completed(future_to_plotcode), total=len(plotcodes), desc="Processing Plotcodes"):
-                row = future.result()
+
+            coordinates = [{"x": x, "y": y} for x, y in lat_lon]
+            logging.info(f"Loaded {len(coordinates)} coordinates from {coord_file}")
+
+            # Batch coordinates for ArcGIS queries; rows keyed by
+            # plotcode so duplicates are overwritten during collection
+            extracted_data = {}
+            processed_plotcodes = set()
+            pltcode_bases = set()
+            known_suffixes = defaultdict(set)
+
+            def bulk_envelope(coords, tiles=10):
+                """Cover all coordinates with at most `tiles` large envelopes
+                (split along x quantiles) instead of one per 5 points."""
+                # Areas with no features produce empty coordinate files;
+                # yield nothing so the run falls through to the fallback path
+                if not coords:
+                    return
+                xs = sorted(c["x"] for c in coords)
+                min_y = min(c["y"] for c in coords) - 100
+                max_y = max(c["y"] for c in coords) + 100
+                step = max(1, (len(xs) + tiles - 1) // tiles)
+                for i in range(0, len(xs), step):
+                    part = xs[i:i + step]
+                    yield {"xmin": part[0] - 100, "ymin": min_y, "xmax": part[-1] + 100, "ymax": max_y}
+
+            async def collect_features(envelope, depth=0):
+                """Query one envelope, splitting it in half when the server
+                truncates the result (exceededTransferLimit)."""
+                arcgis_data = await query_arcgis(session, envelope)
+                if arcgis_data.get("exceededTransferLimit") and depth < 8:
+                    logging.info(f"Transfer limit hit for envelope {envelope}, splitting")
+                    mid_x = (envelope["xmin"] + envelope["xmax"]) / 2
+                    left = await collect_features({**envelope, "xmax": mid_x}, depth + 1)
+                    right = await collect_features({**envelope, "xmin": mid_x}, depth + 1)
+                    return left + right
+                return arcgis_data.get("features", [])
+
+            # Process ArcGIS queries, accumulating plotcode tasks across tiles
+            # so a slow plot in one tile never blocks the next tile's work
+            plot_tasks = []
+            envelopes = list(bulk_envelope(coordinates))
+            for batch in tqdm(envelopes, desc="ArcGIS Queries"):
+                features = await collect_features(batch)
+                if not features:
+                    logging.warning(f"No features found for envelope {batch} in {coord_file}")
+                    continue
+
+                plotcodes = []
+                for feature in features:
+                    plotcode = feature.get("attributes", {}).get("plotcode")
+                    if not plotcode or plotcode in processed_plotcodes:
+                        continue
+                    processed_plotcodes.add(plotcode)
+                    plotcodes.append(plotcode)
+
+                    if len(plotcode) == 14 and plotcode[12:].isdigit():
+                        pltcode_base = plotcode[:12]
+                        suffix = int(plotcode[12:])
+                        pltcode_bases.add(pltcode_base)
+                        known_suffixes[pltcode_base].add(suffix)
+                        logger.debug("Added pltcode_base: %s with suffix %02d from %s", pltcode_base, suffix, plotcode)
+                    else:
+                        logging.warning(f"Invalid plotcode format: {plotcode} (length: {len(plotcode)})")
+
+                plot_tasks.extend(
+                    asyncio.ensure_future(process_plotcode(session, pc, district_space, industrial_area_space, coord_file))
+                    for pc in plotcodes
+                )
+
+            # Drain all plotcode tasks once, after the batch loop
+            for future in tqdm(asyncio.as_completed(plot_tasks), total=len(plot_tasks), desc="Processing Plotcodes"):
+                row = await future
                 if row:
-                    extracted_data.append(row)
-                    logging.info(f"Processed plotcode {row['Plotcode']} with plno {row.get('Plot Number', 'N/A')}")
-
-    # Getplotdetailsbystatus
-    status_url = "http://kiadb.karnataka.gov.in/kiadbgisportal/sulb.asmx/Getplotdetailsbystatus"
-    expected_plnos = set()
-    total_plots = 0
-
-    for dstr, nmindar in [(district_space, industrial_area_space), (district_underscore, industrial_area_underscore)]:
-        response = make_request(session, status_url, json={"dstr": dstr, "nmindar": nmindar, "indx": "Allotted"})
-        if response and response.json().get("d") != "\"Wrong Input\"":
-            status_plots = json.loads(response.json().get("d", "[]"))
-            expected_plnos = set(plot.get("plno") for plot in status_plots if plot.get("plno"))
-            total_plots = len(expected_plnos)
-            logging.info(f"Getplotdetailsbystatus found {total_plots} plots for {dstr}, {nmindar}")
-            break
-        else:
-            logging.warning(f"Getplotdetailsbystatus failed for {dstr}, {nmindar}")
-
-    # Identify missing plots
-    extracted_plnos = set(row.get("Plot Number", "N/A") for row in extracted_data if row.get("Plot Number") != "N/A")
-    missing_plnos = expected_plnos - extracted_plnos
-    logging.info(f"Missing plnos: {missing_plnos}")
-
-    # Fallback iteration for missing plots
-    if missing_plnos:
-        print(f"Found {len(missing_plnos)} missing plots: {missing_plnos}")
-        logging.info(f"Found {len(missing_plnos)} missing plots: {missing_plnos}")
-        if not pltcode_bases:
-            pltcode_bases.add("Z06572016300")
-            logging.warning(f"No pltcode_bases found. Using default: Z06572016300")
-        pltcodes = []
-        seen_suffixes = defaultdict(set)
-
-        for pltcode_base in pltcode_bases:
-            for suffix in sorted(known_suffixes[pltcode_base]):
-                for i in range(max(0, suffix - 5), min(100, suffix + 6)):
-                    if i not in seen_suffixes[pltcode_base]:
-                        pltcode = f"{pltcode_base}{i:02d}"
-                        if len(pltcode) == 14 and pltcode not in processed_plotcodes:
-                            pltcodes.append(pltcode)
-                            seen_suffixes[pltcode_base].add(i)
-            for i in range(100):
-                if i not in seen_suffixes[pltcode_base]:
-                    pltcode = f"{pltcode_base}{i:02d}"
-                    if len(pltcode) == 14 and pltcode not in processed_plotcodes:
-                        pltcodes.append(pltcode)
-                        seen_suffixes[pltcode_base].add(i)
-
-        logging.info(f"Generated {len(pltcodes)} pltcodes for fallback iteration")
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_plotcode = {
-                executor.submit(process_plotcode, session, pc, district_space, industrial_area_space, coord_file): pc
-                for pc in pltcodes
-            }
-            for future in tqdm(as_completed(future_to_plotcode), total=len(pltcodes), desc="Fallback Plotcodes"):
-                row = future.result()
-                if row and row.get("Plot Number") in missing_plnos:
-                    extracted_data.append(row)
-                    processed_plotcodes.add(row["Plotcode"])
-                    extracted_plnos.add(row["Plot Number"])
-                    missing_plnos = expected_plnos - extracted_plnos
-                    logging.info(f"Found missing plot {row['Plot Number']} with pltcode {row['Plotcode']}")
-                    if not missing_plnos:
-                        logging.info("All missing plots found. Stopping fallback iteration.")
-                        break
+                    extracted_data[row["Plotcode"]] = row
+                    logger.debug("Processed plotcode %s with plno %s", row["Plotcode"], row.get("Plot Number", "N/A"))
+
+            # Getplotdetailsbystatus
+            status_url = "http://kiadb.karnataka.gov.in/kiadbgisportal/sulb.asmx/Getplotdetailsbystatus"
+            expected_plnos = set()
+            total_plots = 0
+
+            # Fire both spacing variants concurrently instead of waiting for
+            # the space form to fail before trying the underscore form
+            variants = [(district_space, industrial_area_space), (district_underscore, industrial_area_underscore)]
+            responses = await asyncio.gather(*[
+                fetch_json(session, status_url, json={"dstr": dstr, "nmindar": nmindar, "indx": "Allotted"})
+                for dstr, nmindar in variants
+            ])
+            for (dstr, nmindar), response in zip(variants, responses):
+                if response and response.get("d") != "\"Wrong Input\"":
+                    status_plots = orjson.loads(response.get("d") or b"[]")
+                    expected_plnos = set(plot.get("plno") for plot in status_plots if plot.get("plno"))
+                    total_plots = len(expected_plnos)
+                    logging.info(f"Getplotdetailsbystatus found {total_plots} plots for {dstr}, {nmindar}")
+                    break
+                else:
+                    logging.warning(f"Getplotdetailsbystatus failed for {dstr}, {nmindar}")
+
+            # Identify missing plots
+            extracted_plnos = set(row.get("Plot Number", "N/A") for row in extracted_data.values() if row.get("Plot Number") != "N/A")
+            missing_plnos = expected_plnos - extracted_plnos
+            logging.info(f"Missing plnos: {missing_plnos}")
+
+            # Fallback iteration for missing plots
+            if missing_plnos:
+                print(f"Found {len(missing_plnos)} missing plots: {missing_plnos}")
+                logging.info(f"Found {len(missing_plnos)} missing plots: {missing_plnos}")
+                if not pltcode_bases:
+                    pltcode_bases.add("Z06572016300")
+                    logging.warning(f"No pltcode_bases found. Using default: Z06572016300")
+                # The old nested loops always ended up covering all 100
+                # suffixes per base; generate them directly, ordered by
+                # proximity to the suffixes already seen for that base
+                pltcodes = []
+                for pltcode_base in pltcode_bases:
+                    known = known_suffixes[pltcode_base]
+                    order = sorted(range(100), key=lambda i: (min((abs(i - s) for s in known), default=0), i))
+                    pltcodes.extend(
+                        pltcode for i in order
+                        if (pltcode := f"{pltcode_base}{i:02d}") not in processed_plotcodes
+                    )
+
+                logging.info(f"Generated {len(pltcodes)} pltcodes for fallback iteration")
+                tasks = [
+                    asyncio.ensure_future(process_plotcode(session, pc, district_space, industrial_area_space, coord_file))
+                    for pc in pltcodes
+                ]
+                for future in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Fallback Plotcodes"):
+                    row = await future
+                    if row and row.get("Plot Number") in missing_plnos:
+                        extracted_data[row["Plotcode"]] = row
+                        processed_plotcodes.add(row["Plotcode"])
+                        extracted_plnos.add(row["Plot Number"])
+                        missing_plnos = expected_plnos - extracted_plnos
+                        logger.debug("Found missing plot %s with pltcode %s", row["Plot Number"], row["Plotcode"])
+                        if not missing_plnos:
+                            logging.info("All missing plots found. Stopping fallback iteration.")
+                            for task in tasks:
+                                task.cancel()
+                            break
 
-    # Save data
-    total_plots = len(expected_plnos)
-    missed_plots = len(missing_plnos)
-    if extracted_data:
-        df = pd.DataFrame(extracted_data).drop_duplicates(subset=["Plotcode"])
-        plots_with_contact = len(df[
-            (df["Allottee Phone"].notna() & (df["Allottee Phone"] != "N/A") & (df["Allottee Phone"] != "")) |
-            (df["Allottee Email"].notna() & (df["Allottee Email"] != "N/A") & (df["Allottee Email"] != ""))
-        ])
-        output_file = os.path.join(output_dir, f"{filename}.csv")
-        df.to_csv(output_file, index=False)
-        print(f"Data saved to {output_file} with {len(df)} records")
-        logging.info(f"Data saved to {output_file} with {len(df)} records")
-        summary_data.append({
-            "District": district_space,
-            "Area": industrial_area_space,
-            "Total Plots": total_plots,
-            "Missed Plots": missed_plots,
-            "Plots with Phone or Email": plots_with_contact
-        })
+            # Save data
+            total_plots = len(expected_plnos)
+            missed_plots = len(missing_plnos)
+            if extracted_data:
+                plots_with_contact = sum(
+                    1 for r in extracted_data.values()
+                    if r["Allottee Phone"] not in ("", "N/A", None) or r["Allottee Email"] not in ("", "N/A", None)
+                )
+                output_file = os.path.join(output_dir, f"{filename}.csv")
+                with open(output_file, "w", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=["Plotcode", *field_mapping.keys()])
+                    writer.writeheader()
+                    writer.writerows(extracted_data.values())
+                print(f"Data saved to {output_file} with {len(extracted_data)} records")
+                logging.info(f"Data saved to {output_file} with {len(extracted_data)} records")
+                summary_data.append({
+                    "District": district_space,
+                    "Area": industrial_area_space,
+                    "Total Plots": total_plots,
+                    "Missed Plots": missed_plots,
+                    "Plots with Phone or Email": plots_with_contact
+                })
+            else:
+                print(f"No data extracted for {coord_file}")
+                logging.warning(f"No data extracted for {coord_file}")
+                summary_data.append({
+                    "District": district_space,
+                    "Area": industrial_area_space,
+                    "Total Plots": total_plots,
+                    "Missed Plots": missed_plots,
+                    "Plots with Phone or Email": 0
+                })
+
+    # Save summary
+    if summary_data:
+        summary_file = os.path.join(output_dir, "summary.csv")
+        with open(summary_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["District", "Area", "Total Plots", "Missed Plots", "Plots with Phone or Email"])
+            writer.writeheader()
+            writer.writerows(summary_data)
+        print(f"Summary saved to {summary_file} with {len(summary_data)} records")
+        logging.info(f"Summary saved to {summary_file} with {len(summary_data)} records")
     else:
-        print(f"No data extracted for {coord_file}")
-        logging.warning(f"No data extracted for {coord_file}")
-        summary_data.append({
-            "District": district_space,
-            "Area": industrial_area_space,
-            "Total Plots": total_plots,
-            "Missed Plots": missed_plots,
-            "Plots with Phone or Email": 0
-        })
-
-# Save summary
-if summary_data:
-    summary_df = pd.DataFrame(summary_data)
-    summary_file = os.path.join(output_dir, "summary.csv")
-    summary_df.to_csv(summary_file, index=False)
-    print(f"Summary saved to {summary_file} with {len(summary_df)} records")
-    logging.info(f"Summary saved to {summary_file} with {len(summary_df)} records")
-else:
-    print("No summary data to save")
-    logging.warning("No summary data to save")
-
-print(f"Processing complete. Check {output_dir} for CSV files and kiadb_scrape.log for details.")
+        print("No summary data to save")
+        logging.warning("No summary data to save")
+
+    print(f"Processing complete. Check {output_dir} for CSV files and kiadb_scrape.log for details.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
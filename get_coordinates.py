@@ -1,8 +1,9 @@
-import requests
+import asyncio
 import json
 import os
 import re
 import logging
+import aiohttp
 # Set up logging
 logging.basicConfig(level=logging.INFO, filename="coordinates_scrape.log", format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -29,57 +30,68 @@ headers = {
     "X-Requested-With": "XMLHttpRequest"
 }
 
-for district in districts:
-    print(f"Processing district: {district}")
-    
-    # Step 1: Fetch industrial areas for the district
-    payload = {"District": district}
+# Cap concurrent coordinate fetches so we don't hammer the GIS server
+fetch_semaphore = asyncio.Semaphore(10)
+
+def write_coord_file(filename, lat_lon_tuples):
+    # JSON loads far faster in get_blrindus_data.py than the old
+    # Python-literal format did via ast.literal_eval
+    with open(filename, 'w') as f:
+        json.dump({"lat_lon": lat_lon_tuples}, f)
+
+async def fetch_area(session, district, area):
+    print(f"  Processing {area}...")
+    logging.info(f"  Processing {area}...")
     try:
-        response = requests.post(url_areas, json=payload, headers=headers)
-        response.raise_for_status()
-        industrial_areas = [item["nmindar"] for item in json.loads(json.loads(response.text)["d"])]
-        logging.info(f"Found {len(industrial_areas)} industrial areas in {district}")
-    except requests.RequestException as e:
-        logging.error(f"Error fetching industrial areas for {district}: {e}")
-        industrial_areas = []
-        continue
-
-    # Step 2: Fetch coordinates for each industrial area and create files
-    for area in industrial_areas:
-        print(f"  Processing {area}...")
-        logging.info(f"  Processing {area}...")
-        try:
-            # Fetch coordinates
-            url_coords = url_coords_template.format(area.replace("'", "%27"))  # Escape single quotes
-            response = requests.get(url_coords)
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract coordinates from all rings in all features
-            lat_lon = []
-            for feature in data.get("features", []):
-                for ring in feature.get("geometry", {}).get("rings", []):
-                    lat_lon.extend(ring)  # Each ring is a list of [x, y] coordinates
-
-            # Convert coordinates to tuple format
-            lat_lon_tuples = [(x, y) for x, y in lat_lon]
-
-            # Create output file in coordinates/ folder
-            filename = os.path.join(output_dir, f"{sanitize_filename(district)}-{sanitize_filename(area)}.txt")
-            with open(filename, 'w') as f:
-                f.write("lat_lon = [\n")
-                for i, (x, y) in enumerate(lat_lon_tuples):
-                    f.write(f"    ({x}, {y})")
-                    if i < len(lat_lon_tuples) - 1:
-                        f.write(",")
-                    f.write("\n")
-                f.write("]")
-
-            logging.info(f"  Created file: {filename} with {len(lat_lon_tuples)} coordinates")
-
-        except requests.RequestException as e:
-            logging.error(f"  Error fetching coordinates for {area}: {e}")
-        except Exception as e:
-            logging.error(f"  Error processing {area}: {e}")
+        # Fetch coordinates
+        url_coords = url_coords_template.format(area.replace("'", "%27"))  # Escape single quotes
+        async with fetch_semaphore:
+            async with session.get(url_coords) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+
+        # Extract coordinates from all rings in all features
+        lat_lon = []
+        for feature in data.get("features", []):
+            for ring in feature.get("geometry", {}).get("rings", []):
+                lat_lon.extend(ring)  # Each ring is a list of [x, y] coordinates
+
+        # Convert coordinates to tuple format
+        lat_lon_tuples = [(x, y) for x, y in lat_lon]
+
+        # Create output file in coordinates/ folder; write in a thread so
+        # the event loop keeps fetching while the file hits disk
+        filename = os.path.join(output_dir, f"{sanitize_filename(district)}-{sanitize_filename(area)}.json")
+        await asyncio.to_thread(write_coord_file, filename, lat_lon_tuples)
+
+        logging.info(f"  Created file: {filename} with {len(lat_lon_tuples)} coordinates")
+
+    except aiohttp.ClientError as e:
+        logging.error(f"  Error fetching coordinates for {area}: {e}")
+    except Exception as e:
+        logging.error(f"  Error processing {area}: {e}")
+
+async def main():
+    connector = aiohttp.TCPConnector(limit_per_host=10)
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        for district in districts:
+            print(f"Processing district: {district}")
+
+            # Step 1: Fetch industrial areas for the district
+            payload = {"District": district}
+            try:
+                async with session.post(url_areas, json=payload) as response:
+                    response.raise_for_status()
+                    text = await response.text()
+                industrial_areas = [item["nmindar"] for item in json.loads(json.loads(text)["d"])]
+                logging.info(f"Found {len(industrial_areas)} industrial areas in {district}")
+            except aiohttp.ClientError as e:
+                logging.error(f"Error fetching industrial areas for {district}: {e}")
+                continue
+
+            # Step 2: Fetch coordinates for each industrial area concurrently
+            await asyncio.gather(*[fetch_area(session, district, area) for area in industrial_areas])
+
+asyncio.run(main())
 
 print("Processing complete. Check the coordinates/ folder for generated files.")
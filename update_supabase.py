@@ -1,11 +1,33 @@
 import pandas as pd
+import numpy as np
 import re
 import os
 import logging
 import argparse
+import multiprocessing as mp
+import queue
+import threading
+import httpx
+import pyarrow as pa
+from pyarrow import csv as pacsv
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+# Direct Postgres access for the COPY bulk-load path; optional so the
+# script still runs where only the REST credentials are configured
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+# Google RE2 runs the validation patterns in guaranteed linear time, so
+# adversarial address/email strings can't trigger catastrophic
+# backtracking. Optional: fall back to the stdlib engine when missing.
+try:
+    import re2 as _re2
+except ImportError:
+    _re2 = None
+
 # Set up argument parser
 parser = argparse.ArgumentParser(description="Process KIADB CSV files and update Supabase database")
 parser.add_argument("--update", action="store_true", help="Process only new CSV files (without corresponding updated_ files) and update tables instead of clearing")
@@ -22,46 +44,71 @@ logging.basicConfig(
 load_dotenv(".env.local")
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
+supabase_db_url = os.getenv("SUPABASE_DB_URL")
 
 # Initialize Supabase client
 supabase = create_client(supabase_url, supabase_key)
 
-# Validation and cleaning functions
+# Swap the PostgREST transport for a pooled HTTP/2 client so every
+# upsert reuses one TLS connection instead of paying a handshake per
+# call; base_url and auth headers carry over from the default session
+_default_session = supabase.postgrest.session
+supabase.postgrest.session = httpx.Client(
+    base_url=_default_session.base_url,
+    headers=_default_session.headers,
+    http2=True,
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+_default_session.close()
+
+# Validation patterns, kept as strings: the vectorized path hands them
+# to pandas' Arrow string kernels, which match through Google RE2 —
+# linear-time finite automata with no backtracking, run entirely in
+# native code. RE2's $ only matches at end of text; groups are
+# non-capturing.
+_PHONE_PATTERN = r"^(?:\+91)?[6-9]\d{9}$"
+_EMAIL_PATTERN = r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$"
+
+# Compiled copies for the scalar helpers; the stdlib fallback swaps $
+# for \Z to keep the same end-of-text (not end-of-line) semantics
+if _re2 is not None:
+    _PHONE_RE_SCALAR = _re2.compile(_PHONE_PATTERN)
+    _EMAIL_RE_SCALAR = _re2.compile(_EMAIL_PATTERN)
+else:
+    _PHONE_RE_SCALAR = re.compile(r"^(?:\+91)?[6-9]\d{9}\Z")
+    _EMAIL_RE_SCALAR = re.compile(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\Z")
+
 def is_valid_phone(phone):
     if pd.isna(phone) or phone == "N/A" or not phone:
         return False
-    pattern = r"^(\+91)?[6-9][0-9]{9}$"
-    return bool(re.match(pattern, str(phone)))
+    return _PHONE_RE_SCALAR.match(str(phone)) is not None
 
 def is_valid_email(email):
     if pd.isna(email) or email == "N/A" or not email:
         return False
-    pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    return bool(re.match(pattern, str(email)))
-
-def clean_address(address):
-    if pd.isna(address) or address == "N/A" or not address:
-        return None
-    # Remove line feeds, carriage returns, and normalize whitespace
-    cleaned = re.sub(r'[\n\r]+', ' ', str(address)).strip()
-    cleaned = re.sub(r'\s+', ' ', cleaned)
-    return cleaned
-
-def truncate_nature_of_industry(industry):
-    if pd.isna(industry) or industry == "N/A" or not industry:
-        return None
-    # Truncate to 300 characters to avoid length errors
-    return str(industry)[:300]
-
-# Directory containing CSVs
+    email = str(email)
+    # Cheap byte-level rejects before engaging the regex engine: exactly
+    # one @ with something before it, a dot somewhere in the domain, and
+    # the RFC 5321 length cap
+    at = email.find("@")
+    if at < 1 or at != email.rfind("@") or "." not in email[at + 2:] or len(email) > 254:
+        return False
+    return _EMAIL_RE_SCALAR.match(email) is not None
+
+# Directory containing CSVs; one scandir pass gives both the CSV list
+# and the updated_ existence checks without per-file stat() calls
 csv_dir = "kiadb_data"
+entries = {e.name: e.stat().st_mtime for e in os.scandir(csv_dir) if e.is_file()}
 # Get all CSV files excluding summary.csv and updated_ files
-all_csv_files = [f for f in os.listdir(csv_dir) if f.endswith(".csv") and f != "summary.csv" and not f.startswith("updated_")]
+all_csv_files = sorted(f for f in entries if f.endswith(".csv") and f != "summary.csv" and not f.startswith("updated_"))
 
-# Filter files based on --update flag
+# Filter files based on --update flag: new files, plus files whose
+# source CSV changed since its updated_ copy was produced (only their
+# changed rows get re-merged; see the row-hash skip in process_one)
 if args.update:
-    csv_files = [f for f in all_csv_files if not os.path.exists(os.path.join(csv_dir, f"updated_{f}"))]
-    print(f"Processing new files only: {csv_files}")
+    csv_files = [f for f in all_csv_files if f"updated_{f}" not in entries or entries[f] > entries[f"updated_{f}"]]
+    print(f"Processing new or changed files only: {csv_files}")
 else:
     csv_files = all_csv_files
     print(f"Processing all files: {csv_files}")
@@ -69,8 +116,59 @@ else:
 # Dictionary to store merged data by Plotcode
 plot_data = {}
 
-# Process each CSV with error handling
-for csv_file in csv_files:
+def parquet_cache_path(csv_file):
+    return os.path.join(csv_dir, f"updated_{os.path.splitext(csv_file)[0]}.parquet")
+
+def row_hash_path(csv_file):
+    return os.path.join(csv_dir, f"updated_{os.path.splitext(csv_file)[0]}_hashes.parquet")
+
+# Status strings indexed by phone_valid * 2 + email_valid
+_STATUS_LOOKUP = np.array(["both_invalid", "invalid_phone", "invalid_email", "valid"], dtype=object)
+
+# Columns that feed the merged plot_data; a row whose values here are
+# unchanged from the previous run cannot alter the upsert payload
+HASH_COLUMNS = [
+    "Plotcode", "District Name", "Name of the Industrial Area", "Plot Number",
+    "Area in acres", "Name of Allottee", "Allottee Phone", "Allottee Email",
+    "Address of the Allottee", "Nature Of Industry", "ULPIN", "Plot Status",
+]
+
+def load_csv(csv_file):
+    # Arrow's reader parses in parallel C++ threads and releases the GIL,
+    # so several files can be decoded at once
+    try:
+        # Reuse the Parquet cache from an earlier run when the source CSV
+        # hasn't changed: columnar and already typed, so no re-tokenization
+        pq_path = parquet_cache_path(csv_file)
+        csv_path = os.path.join(csv_dir, csv_file)
+        if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(csv_path):
+            return csv_file, pd.read_parquet(pq_path, engine="pyarrow", dtype_backend="pyarrow")
+        tbl = pacsv.read_csv(
+            os.path.join(csv_dir, csv_file),
+            read_options=pacsv.ReadOptions(use_threads=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={"Plotcode": pa.string(), "Area in acres": pa.float64()},
+                # Match pd.read_csv: empty string cells are nulls, not ""
+                strings_can_be_null=True,
+            ),
+        )
+        # Arrow-backed dtypes all the way through: no NumPy object
+        # conversion on load, and NA handling stays native downstream
+        return csv_file, tbl.to_pandas(types_mapper=pd.ArrowDtype)
+    except Exception as e:
+        logging.error(f"Error reading {csv_file}: {e}")
+        return csv_file, None
+
+def _notna(value):
+    # Cheap NaN/NA check without pandas dispatch overhead (NaN != NaN)
+    return value is not None and value is not pd.NA and value == value
+
+def process_one(csv_file):
+    """Validate one CSV, write its updated_ copy, and return the file's
+    partial plot_data dict (None on failure)."""
+    csv_file, df = load_csv(csv_file)
+    if df is None:
+        return csv_file, None
     try:
         # Remove corresponding updated_ file if it exists
         updated_file = os.path.join(csv_dir, f"updated_{csv_file}")
@@ -78,71 +176,142 @@ for csv_file in csv_files:
             os.remove(updated_file)
             print(f"Removed existing file: {updated_file}")
 
-        df = pd.read_csv(os.path.join(csv_dir, csv_file))
-        df["validation_status"] = "both_invalid"
-
-        for index, row in df.iterrows():
-            plotcode = str(row["Plotcode"])
-            phone = str(row["Allottee Phone"]) if pd.notna(row["Allottee Phone"]) else "N/A"
-            email = str(row["Allottee Email"]) if pd.notna(row["Allottee Email"]) else "N/A"
-            address = clean_address(row["Address of the Allottee"])
-            industry = truncate_nature_of_industry(row["Nature Of Industry"])
-            phone_valid = is_valid_phone(phone)
-            email_valid = is_valid_email(email)
-
-            # Set validation status
-            if phone_valid and email_valid:
-                df.at[index, "validation_status"] = "valid"
-            elif phone_valid:
-                df.at[index, "validation_status"] = "invalid_email"
-            elif email_valid:
-                df.at[index, "validation_status"] = "invalid_phone"
-
-            # Initialize or update plot_data (for valid contacts only)
-            if phone_valid or email_valid:
-                if plotcode not in plot_data:
-                    plot_data[plotcode] = {
-                        "district_name": set(),
-                        "industrial_area": set(),
-                        "plot_number": str(row["Plot Number"]) if pd.notna(row["Plot Number"]) else None,
-                        "area_acres": float(row["Area in acres"]) if pd.notna(row["Area in acres"]) else None,
-                        "allottee_name": str(row["Name of Allottee"]) if pd.notna(row["Name of Allottee"]) else None,
-                        "allottee_phone": None,
-                        "allottee_email": None,
-                        "address": address,
-                        "nature_of_industry": industry,
-                        "ulpin": str(row["ULPIN"]) if pd.notna(row["ULPIN"]) else None,
-                        "plot_status": str(row["Plot Status"]) if pd.notna(row["Plot Status"]) else None,
-                        "phone_valid": False,
-                        "email_valid": False
-                    }
-
-                # Update district and industrial area
-                if pd.notna(row["District Name"]):
-                    plot_data[plotcode]["district_name"].add(str(row["District Name"]))
-                if pd.notna(row["Name of the Industrial Area"]):
-                    plot_data[plotcode]["industrial_area"].add(str(row["Name of the Industrial Area"]))
-
-                # Update contact details if valid
-                if phone_valid and not plot_data[plotcode]["phone_valid"]:
-                    plot_data[plotcode]["allottee_phone"] = phone
-                    plot_data[plotcode]["phone_valid"] = True
-                if email_valid and not plot_data[plotcode]["email_valid"]:
-                    plot_data[plotcode]["allottee_email"] = email
-                    plot_data[plotcode]["email_valid"] = True
-                if address and not plot_data[plotcode]["address"]:
-                    plot_data[plotcode]["address"] = address
-                if industry and not plot_data[plotcode]["nature_of_industry"]:
-                    plot_data[plotcode]["nature_of_industry"] = industry
-
-        # Save updated CSV
-        df.to_csv(updated_file, index=False)
+        # Validate phone/email across whole columns instead of per row
+        phone_s = df["Allottee Phone"].astype("string[pyarrow]").fillna("N/A")
+        email_s = df["Allottee Email"].astype("string[pyarrow]").fillna("N/A")
+        phone_valid_s = phone_s.str.match(_PHONE_PATTERN).fillna(False).to_numpy(dtype=bool)
+        email_valid_s = email_s.str.match(_EMAIL_PATTERN).fillna(False).to_numpy(dtype=bool)
+        # Branchless status: pack (phone_valid, email_valid) into a 2-bit
+        # index and gather from the lookup table in one pass, instead of
+        # np.select evaluating three condition arrays
+        idx = phone_valid_s.astype(np.uint8) * 2 + email_valid_s.astype(np.uint8)
+        df["validation_status"] = _STATUS_LOOKUP[idx]
+
+        # Clean addresses and truncate industry in one vectorized pass
+        address_s = df["Address of the Allottee"].astype("string[pyarrow]").replace("N/A", pd.NA)
+        # \s already covers \n and \r, so one pass collapses all whitespace
+        address_s = address_s.str.replace(r'\s+', ' ', regex=True).str.strip()
+        industry_s = df["Nature Of Industry"].astype("string[pyarrow]").replace("N/A", pd.NA).str[:300]
+
+        # Merge rows carrying at least one valid contact in a single
+        # groupby pass: hashing and reduction happen inside pandas' C code
+        # instead of one dict update per row. Scalars keep the first row's
+        # value per plotcode; contacts/address/industry keep the first
+        # non-null; district/area collect ordered unique values.
+        # Incremental skip on --update runs: hash the merge-relevant
+        # columns per row and drop rows whose hash already appeared in
+        # the previous run, so work scales with the delta, not the file
+        row_hashes = pd.util.hash_pandas_object(df[HASH_COLUMNS], index=False)
+        fresh = np.ones(len(df), dtype=bool)
+        hash_path = row_hash_path(csv_file)
+        if args.update and os.path.exists(hash_path):
+            prior_hashes = pd.read_parquet(hash_path, engine="pyarrow")["row_hash"]
+            fresh = ~row_hashes.isin(prior_hashes).to_numpy(dtype=bool)
+            # The upsert rewrites every column of a plotcode, so keep all
+            # rows of any plotcode with at least one fresh row; only
+            # plotcodes whose rows are all unchanged may be skipped
+            fresh |= df["Plotcode"].isin(df["Plotcode"][fresh]).to_numpy(dtype=bool)
+
+        file_plot_data = {}
+        pos = np.flatnonzero((phone_valid_s | email_valid_s) & fresh)
+        if pos.size:
+            sub = pd.DataFrame({
+                "plotcode": df["Plotcode"].iloc[pos].astype("string[pyarrow]"),
+                "district_name": df["District Name"].iloc[pos].astype("string[pyarrow]"),
+                "industrial_area": df["Name of the Industrial Area"].iloc[pos].astype("string[pyarrow]"),
+                "plot_number": df["Plot Number"].iloc[pos].astype("string[pyarrow]"),
+                "area_acres": df["Area in acres"].iloc[pos],
+                "allottee_name": df["Name of Allottee"].iloc[pos].astype("string[pyarrow]"),
+                "allottee_phone": phone_s.iloc[pos].where(phone_valid_s[pos]),
+                "allottee_email": email_s.iloc[pos].where(email_valid_s[pos]),
+                "address": address_s.iloc[pos],
+                "nature_of_industry": industry_s.iloc[pos],
+                "ulpin": df["ULPIN"].iloc[pos].astype("string[pyarrow]"),
+                "plot_status": df["Plot Status"].iloc[pos].astype("string[pyarrow]"),
+                "phone_valid": phone_valid_s[pos],
+                "email_valid": email_valid_s[pos],
+            })
+            first_row = lambda s: s.iloc[0]
+            unique_list = lambda s: list(dict.fromkeys(s.dropna()))
+            agg = sub.groupby("plotcode", sort=False).agg(
+                district_name=("district_name", unique_list),
+                industrial_area=("industrial_area", unique_list),
+                plot_number=("plot_number", first_row),
+                area_acres=("area_acres", first_row),
+                allottee_name=("allottee_name", first_row),
+                allottee_phone=("allottee_phone", "first"),
+                allottee_email=("allottee_email", "first"),
+                address=("address", "first"),
+                nature_of_industry=("nature_of_industry", "first"),
+                ulpin=("ulpin", first_row),
+                plot_status=("plot_status", first_row),
+                phone_valid=("phone_valid", "any"),
+                email_valid=("email_valid", "any"),
+            )
+            for rec in agg.itertuples():
+                file_plot_data[str(rec.Index)] = {
+                    "district_name": rec.district_name,
+                    "industrial_area": rec.industrial_area,
+                    "plot_number": rec.plot_number if _notna(rec.plot_number) else None,
+                    "area_acres": float(rec.area_acres) if _notna(rec.area_acres) else None,
+                    "allottee_name": rec.allottee_name if _notna(rec.allottee_name) else None,
+                    "allottee_phone": rec.allottee_phone if _notna(rec.allottee_phone) else None,
+                    "allottee_email": rec.allottee_email if _notna(rec.allottee_email) else None,
+                    "address": rec.address if _notna(rec.address) else None,
+                    "nature_of_industry": rec.nature_of_industry if _notna(rec.nature_of_industry) else None,
+                    "ulpin": rec.ulpin if _notna(rec.ulpin) else None,
+                    "plot_status": rec.plot_status if _notna(rec.plot_status) else None,
+                    "phone_valid": bool(rec.phone_valid),
+                    "email_valid": bool(rec.email_valid),
+                }
+
+        # Save updated CSV through Arrow's C++ writer (cells formatted in
+        # native code) on a background thread while the Parquet cache for
+        # the next run is written on this one
+        out_table = pa.Table.from_pandas(df, preserve_index=False)
+        writer = threading.Thread(target=pacsv.write_csv, args=(out_table, updated_file))
+        writer.start()
+        df.to_parquet(parquet_cache_path(csv_file), engine="pyarrow", compression="zstd")
+        pd.DataFrame({"row_hash": row_hashes}).to_parquet(hash_path, engine="pyarrow")
+        writer.join()
         print(f"Created updated CSV: {updated_file}")
+        return csv_file, file_plot_data
 
     except Exception as e:
         logging.error(f"Error processing {csv_file}: {e}")
-        print(f"Error processing {csv_file}. Check processing_errors.log for details. Continuing with next file.")
-        continue
+        return csv_file, None
+
+def merge_plot_data(target, partial):
+    # Extend lists without duplicates, keep the first valid contact and
+    # first non-null scalars, mirroring the old single-pass merge semantics
+    for plotcode, data in partial.items():
+        if plotcode not in target:
+            target[plotcode] = data
+            continue
+        merged = target[plotcode]
+        for key in ("district_name", "industrial_area"):
+            bucket = merged[key]
+            bucket.extend(value for value in data[key] if value not in bucket)
+        if data["phone_valid"] and not merged["phone_valid"]:
+            merged["allottee_phone"] = data["allottee_phone"]
+            merged["phone_valid"] = True
+        if data["email_valid"] and not merged["email_valid"]:
+            merged["allottee_email"] = data["allottee_email"]
+            merged["email_valid"] = True
+        for key in ("plot_number", "area_acres", "allottee_name", "address", "nature_of_industry", "ulpin", "plot_status"):
+            if merged[key] is None and data[key] is not None:
+                merged[key] = data[key]
+
+# Each file is independent, so fan one worker out per file and merge the
+# partial dicts in the parent. imap (not imap_unordered) keeps the merge
+# in sorted-file order so first-value-wins resolution is deterministic
+if csv_files:
+    with mp.get_context("fork").Pool(min(os.cpu_count(), len(csv_files))) as pool:
+        for csv_file, partial in pool.imap(process_one, csv_files):
+            if partial is None:
+                print(f"Error processing {csv_file}. Check processing_errors.log for details. Continuing with next file.")
+                continue
+            merge_plot_data(plot_data, partial)
 
 # Clear Supabase tables only if --update is not used
 if not args.update:
@@ -155,41 +324,105 @@ if not args.update:
         print(f"Error truncating Supabase tables. Check processing_errors.log for details.")
         exit(1)
 
+def chunked(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+# Batch size for PostgREST requests; one round trip per batch instead of
+# one per plotcode
+BATCH_SIZE = 500
+
+# Concurrent upsert workers: while one batch waits on the network the
+# others keep the HTTP/2 connection busy
+UPSERT_WORKERS = 8
+
+def upsert_worker(batches):
+    while (chunk := batches.get()) is not None:
+        try:
+            supabase.table("kiadb_property_owners").upsert(chunk, on_conflict="plotcode").execute()
+        except Exception as e:
+            logging.error(f"Error upserting batch of {len(chunk)} plotcodes: {e}")
+            print(f"Error upserting a batch of {len(chunk)} plotcodes. Check processing_errors.log for details.")
+
 # Populate or update Supabase tables
-for plotcode, data in plot_data.items():
-    # Convert sets to lists for PostgreSQL arrays
-    data["district_name"] = list(data["district_name"])
-    data["industrial_area"] = list(data["industrial_area"])
+rows = [
+    {
+        "plotcode": plotcode,
+        # Already lists, which map straight onto PostgreSQL arrays
+        "district_name": data["district_name"],
+        "industrial_area": data["industrial_area"],
+        "plot_number": data["plot_number"],
+        "area_acres": data["area_acres"],
+        "allottee_name": data["allottee_name"],
+        "allottee_phone": data["allottee_phone"],
+        "allottee_email": data["allottee_email"],
+        "address": data["address"],
+        "nature_of_industry": data["nature_of_industry"],
+        "ulpin": data["ulpin"],
+        "plot_status": data["plot_status"],
+        "phone_valid": data["phone_valid"],
+        "email_valid": data["email_valid"]
+    }
+    for plotcode, data in plot_data.items()
+]
 
-    # Upsert into kiadb_property_owners
-    try:
-        supabase.table("kiadb_property_owners").upsert({
-            "plotcode": plotcode,
-            "district_name": data["district_name"],
-            "industrial_area": data["industrial_area"],
-            "plot_number": data["plot_number"],
-            "area_acres": data["area_acres"],
-            "allottee_name": data["allottee_name"],
-            "allottee_phone": data["allottee_phone"],
-            "allottee_email": data["allottee_email"],
-            "address": data["address"],
-            "nature_of_industry": data["nature_of_industry"],
-            "ulpin": data["ulpin"],
-            "plot_status": data["plot_status"],
-            "phone_valid": data["phone_valid"],
-            "email_valid": data["email_valid"]
-        }, on_conflict="plotcode").execute()
-
-        # Check if plotcode exists in ai_agent_data
-        existing = supabase.table("ai_agent_data").select("plotcode").eq("plotcode", plotcode).execute()
-        if not existing.data:  # Insert only if plotcode doesn't exist
-            supabase.table("ai_agent_data").insert({
-                "plotcode": plotcode
-            }).execute()
+OWNER_COLUMNS = (
+    "plotcode", "district_name", "industrial_area", "plot_number", "area_acres",
+    "allottee_name", "allottee_phone", "allottee_email", "address",
+    "nature_of_industry", "ulpin", "plot_status", "phone_valid", "email_valid",
+)
+
+def upsert_via_copy(rows):
+    """Bulk-load through Postgres COPY into a temp staging table, then
+    merge with one INSERT ... ON CONFLICT. COPY is the fastest ingest
+    path Postgres has and skips PostgREST's per-row JSON handling;
+    psycopg adapts the district/area lists to arrays natively."""
+    cols = ", ".join(OWNER_COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in OWNER_COLUMNS if c != "plotcode")
+    with psycopg.connect(supabase_db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE staging_kiadb AS SELECT {cols} FROM kiadb_property_owners WITH NO DATA")
+            with cur.copy(f"COPY staging_kiadb ({cols}) FROM STDIN") as cp:
+                for row in rows:
+                    cp.write_row(tuple(row[c] for c in OWNER_COLUMNS))
+            cur.execute(
+                f"INSERT INTO kiadb_property_owners ({cols}) SELECT {cols} FROM staging_kiadb "
+                f"ON CONFLICT (plotcode) DO UPDATE SET {updates}"
+            )
 
+def upsert_via_postgrest(rows):
+    # Bounded queue keeps at most a couple of batches in flight per worker
+    upsert_queue = queue.Queue(maxsize=UPSERT_WORKERS * 2)
+    workers = [threading.Thread(target=upsert_worker, args=(upsert_queue,)) for _ in range(UPSERT_WORKERS)]
+    for worker in workers:
+        worker.start()
+    for chunk in chunked(rows, BATCH_SIZE):
+        upsert_queue.put(chunk)
+    for _ in workers:
+        upsert_queue.put(None)
+    for worker in workers:
+        worker.join()
+
+if supabase_db_url and psycopg is not None:
+    try:
+        upsert_via_copy(rows)
+        print(f"Upserted {len(rows)} plotcodes via COPY")
     except Exception as e:
-        logging.error(f"Error processing plotcode {plotcode}: {e}")
-        print(f"Error processing plotcode {plotcode}. Check processing_errors.log for details.")
-        continue
+        logging.error(f"COPY upsert failed, falling back to PostgREST: {e}")
+        print("COPY upsert failed. Check processing_errors.log for details. Falling back to PostgREST.")
+        upsert_via_postgrest(rows)
+else:
+    upsert_via_postgrest(rows)
+
+# Idempotent insert into ai_agent_data: Postgres resolves duplicates on
+# the plotcode unique index (Prefer: resolution=ignore-duplicates), so no
+# existence check round trip and no race window
+try:
+    agent_rows = [{"plotcode": plotcode} for plotcode in plot_data]
+    for chunk in chunked(agent_rows, 1000):
+        supabase.table("ai_agent_data").upsert(chunk, on_conflict="plotcode", ignore_duplicates=True).execute()
+except Exception as e:
+    logging.error(f"Error populating ai_agent_data: {e}")
+    print(f"Error populating ai_agent_data. Check processing_errors.log for details.")
 
 print("Supabase population complete.")